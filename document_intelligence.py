@@ -1,70 +1,245 @@
 import os
-import json
+import orjson
 import datetime
 import re
+import concurrent.futures
+import hashlib
+import shelve
 import pdfplumber
-from sentence_transformers import SentenceTransformer, util
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+try:
+    import faiss
+except ImportError:
+    faiss = None
+import numpy as np
+from sentence_transformers import SentenceTransformer
 import torch
 from typing import List, Dict, Any
+from dataclasses import dataclass, replace
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# One alternation so the regex engine walks the line once in C instead
+# of crossing the Python/C boundary per candidate pattern.
+_HEADER_RE = re.compile(
+    r'(?:^[A-Z][A-Za-z\s&-]+$)'
+    r'|(?:^\d+\.\s*[A-Z])'
+    r'|(?:^[IVX]+\.\s*[A-Z])'
+    r'|(?:^[A-Z\s]+$)'
+    r'|(?:^[A-Z][a-z]+\s+[A-Z][a-z]+)'
+)
+_SENTENCE_SPLIT_RE = re.compile(r'[.!?]')
+_DIGIT_TAB = str.maketrans('', '', '0123456789')
+
+_CONTENT_TYPE_RE = re.compile(
+    r'(abstract|summary|introduction|background|method|approach'
+    r'|result|finding|conclusion|discussion|reference|bibliography)',
+    re.IGNORECASE
+)
+_CONTENT_TYPE_MAP = {
+    'abstract': 'abstract',
+    'summary': 'abstract',
+    'introduction': 'introduction',
+    'background': 'introduction',
+    'method': 'methodology',
+    'approach': 'methodology',
+    'result': 'results',
+    'finding': 'results',
+    'conclusion': 'conclusion',
+    'discussion': 'conclusion',
+    'reference': 'references',
+    'bibliography': 'references',
+}
+
+_CONTENT_TYPE_WEIGHTS = {
+    'abstract': 1.2,
+    'introduction': 1.1,
+    'methodology': 1.3,
+    'results': 1.3,
+    'conclusion': 1.2,
+    'references': 0.5,
+    'content': 1.0
+}
+# Integer-id view of the weight table so weighting is one tensor gather
+# plus an elementwise multiply instead of a dict lookup per section.
+_TYPE_TO_ID = {t: i for i, t in enumerate(_CONTENT_TYPE_WEIGHTS)}
+_WEIGHT_TABLE = torch.tensor(list(_CONTENT_TYPE_WEIGHTS.values()))
+
+@dataclass(slots=True)
+class Section:
+    """One extracted section. Slots halve the per-record memory of the
+    old dict representation and make field access a fixed offset load."""
+    document: str
+    text: str
+    section_title: str
+    page: int
+    content_type: str
+    importance_rank: int = 0
+    relevance_score: float = 0.0
+
+class _EmbeddingCache:
+    """Persistent text -> embedding cache so repeat runs over overlapping
+    corpora skip the transformer forward pass for identical sections."""
+
+    def __init__(self, path="emb_cache.db"):
+        self.path = path
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        return hashlib.blake2b(
+            f"{model_name}\0{text}".encode(), digest_size=16
+        ).hexdigest()
+
+    def lookup(self, keys: List[str]) -> Dict[str, Any]:
+        hits = {}
+        try:
+            with shelve.open(self.path) as db:
+                for k in keys:
+                    if k in db:
+                        hits[k] = db[k]
+        except Exception as e:
+            logger.warning(f"Embedding cache read failed: {e}")
+        return hits
+
+    def store(self, items: Dict[str, Any]):
+        try:
+            with shelve.open(self.path) as db:
+                for k, v in items.items():
+                    db[k] = v
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
 class DocumentIntelligenceSystem:
     def __init__(self, model_name="all-MiniLM-L6-v2", top_k=10):
         self.model_name = model_name
         self.top_k = top_k
         self.model = None
+        self._embedding_cache = _EmbeddingCache()
+        self._corpus_cache = {}
 
     def load_model(self):
-        self.model = SentenceTransformer(self.model_name)
+        torch.set_num_threads(os.cpu_count())
+        torch.set_grad_enabled(False)
+        if torch.cuda.is_available():
+            # FP16 MiniLM is ~2x fp32 on GPU with negligible cosine drift
+            # on unit-normalized outputs; the int8 ONNX path below only
+            # pays off on CPU.
+            self.model = SentenceTransformer(self.model_name, device="cuda")
+            self.model.half()
+        else:
+            try:
+                # int8 ONNX export: fused ONNX Runtime kernels plus VNNI int8
+                # matmuls give a 3-5x CPU speedup over the fp32 torch path.
+                self.model = SentenceTransformer(
+                    self.model_name,
+                    backend="onnx",
+                    model_kwargs={"file_name": "onnx/model_qint8_avx512_vnni.onnx"}
+                )
+                # Confirm the int8 export actually resolved; a miss makes
+                # optimum auto-export plain fp32 ONNX instead, which would
+                # silently forfeit the quantization speedup.
+                loaded = getattr(self.model[0].auto_model, "model_path", None)
+                if loaded is None or "qint8" not in str(loaded):
+                    raise RuntimeError(
+                        f"expected int8 ONNX weights, resolved: {loaded}"
+                    )
+                logger.info(f"Loaded quantized ONNX backend: {loaded}")
+            except Exception as e:
+                logger.warning(f"ONNX backend unavailable, falling back to torch: {e}")
+                self.model = SentenceTransformer(self.model_name)
+        self.model.eval()
+        # MiniLM's native window; truncating here keeps one oversized
+        # section from padding out the whole batch it lands in.
+        self.model.max_seq_length = 256
 
-    def extract_text_chunks(self, pdf_path: str) -> List[Dict]:
+    def extract_text_chunks(self, pdf_path: str) -> List[Section]:
         chunks = []
+        document_name = os.path.basename(pdf_path)
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                document_name = os.path.basename(pdf_path)
-                for page_num, page in enumerate(pdf.pages, 1):
-                    text = page.extract_text()
-                    if not text:
-                        continue
-                    sections = self._extract_sections_from_page(text)
-                    for section in sections:
-                        if self._is_meaningful_section(section['text']):
-                            chunks.append({
-                                'document': document_name,
-                                'text': section['text'],
-                                'section_title': section['title'],
-                                'page': page_num,
-                                'content_type': self._classify_content_type(section['text'])
-                            })
+            if pdfium is not None:
+                page_texts = self._extract_page_texts_pdfium(pdf_path)
+            else:
+                page_texts = self._extract_page_texts_pdfplumber(pdf_path)
         except Exception as e:
             logger.error(f"Failed to process PDF '{pdf_path}': {e}")
+            return chunks
+        for page_num, text in page_texts:
+            if not text:
+                continue
+            sections = self._extract_sections_from_page(text)
+            for section in sections:
+                if self._is_meaningful_section(section['text']):
+                    chunks.append(Section(
+                        document=document_name,
+                        text=section['text'],
+                        section_title=section['title'],
+                        page=page_num,
+                        content_type=self._classify_content_type(section['text'])
+                    ))
         return chunks
 
+    def _extract_page_texts_pdfium(self, pdf_path: str) -> List[tuple]:
+        # PDFium skips pdfminer's Python layout analysis entirely, which
+        # makes plain text extraction 5-20x faster. It is not thread-safe,
+        # so pages stay sequential here; parallelism comes from the
+        # per-document worker processes.
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            page_texts = []
+            for page_idx in range(len(pdf)):
+                page = pdf[page_idx]
+                textpage = page.get_textpage()
+                page_texts.append((page_idx + 1, textpage.get_text_range()))
+                textpage.close()
+                page.close()
+            return page_texts
+        finally:
+            pdf.close()
+
+    def _extract_page_texts_pdfplumber(self, pdf_path: str) -> List[tuple]:
+        # pdfminer shares one parser stream and resource manager across
+        # the document's pages, so like PDFium this is not thread-safe;
+        # pages stay sequential and parallelism comes from the
+        # per-document worker processes.
+        page_texts = []
+        with pdfplumber.open(pdf_path) as pdf:
+            for page_num, page in enumerate(pdf.pages, 1):
+                try:
+                    page_texts.append((page_num, page.extract_text()))
+                finally:
+                    # Drop the page's char/object caches as soon as the
+                    # text is out, so peak memory stays near one page's
+                    # worth instead of accumulating across a large PDF.
+                    page.flush_cache()
+        return page_texts
+
     def _extract_sections_from_page(self, text: str) -> List[Dict]:
         sections = []
         lines = text.split('\n')
-        current = {'title': '', 'text': ''}
+        current = {'title': '', 'text': []}
 
         for line in lines:
             line = line.strip()
             if not line:
                 continue
             if self._is_section_header(line):
-                if current['text'].strip():
+                if current['text']:
                     sections.append({
                         'title': current['title'] or line[:100],
-                        'text': current['text'].strip()
+                        'text': ' '.join(current['text'])
                     })
-                current = {'title': line, 'text': ''}
+                current = {'title': line, 'text': []}
             else:
-                current['text'] += line + ' '
-        if current['text'].strip():
+                current['text'].append(line)
+        if current['text']:
             sections.append({
                 'title': current['title'] or 'Content',
-                'text': current['text'].strip()
+                'text': ' '.join(current['text'])
             })
         if not sections and text.strip():
             title = self._extract_meaningful_title(text)
@@ -77,24 +252,16 @@ class DocumentIntelligenceSystem:
     def _is_section_header(self, line: str) -> bool:
         if len(line) < 3 or len(line) > 150:
             return False
-        patterns = [
-            r'^[A-Z][A-Za-z\s&-]+$',
-            r'^\d+\.\s*[A-Z]',
-            r'^[IVX]+\.\s*[A-Z]',
-            r'^[A-Z\s]+$',
-            r'^[A-Z][a-z]+\s+[A-Z][a-z]+',
-        ]
-        for pattern in patterns:
-            if re.match(pattern, line):
-                if line.isupper() and len(line) > 50:
-                    continue
-                if line.count('.') > 3:
-                    continue
-                return True
-        return False
+        if not _HEADER_RE.match(line):
+            return False
+        if line.isupper() and len(line) > 50:
+            return False
+        if line.count('.') > 3:
+            return False
+        return True
 
     def _extract_meaningful_title(self, text: str) -> str:
-        sentences = re.split(r'[.!?]', text)
+        sentences = _SENTENCE_SPLIT_RE.split(text)
         for sentence in sentences[:3]:
             sentence = sentence.strip()
             if 20 <= len(sentence) <= 100:
@@ -108,29 +275,20 @@ class DocumentIntelligenceSystem:
         return ' '.join(words) + ('...' if len(text.split()) > 10 else '')
 
     def _is_meaningful_section(self, text: str) -> bool:
+        digit_count = len(text) - len(text.translate(_DIGIT_TAB))
         noise = [
             len(text.split()) < 10,
             (text.count('\n') / len(text) > 0.1) if len(text) > 0 else False,
-            (len(re.findall(r'\d', text)) / len(text) > 0.3) if len(text) > 0 else False,
+            (digit_count / len(text) > 0.3) if len(text) > 0 else False,
         ]
         return not any(noise)
 
     def _classify_content_type(self, text: str) -> str:
-        text = text.lower()
-        if 'abstract' in text or 'summary' in text:
-            return 'abstract'
-        elif 'introduction' in text or 'background' in text:
-            return 'introduction'
-        elif 'method' in text or 'approach' in text:
-            return 'methodology'
-        elif 'result' in text or 'finding' in text:
-            return 'results'
-        elif 'conclusion' in text or 'discussion' in text:
-            return 'conclusion'
-        elif 'reference' in text or 'bibliography' in text:
-            return 'references'
-        else:
-            return 'content'
+        # Content type is a headline signal, so scanning the first 500
+        # chars once beats twelve full-text substring searches (and the
+        # full lowercased copy the old chain needed).
+        m = _CONTENT_TYPE_RE.search(text[:500])
+        return _CONTENT_TYPE_MAP[m.group(1).lower()] if m else 'content'
 
     def create_persona_query(self, persona: Dict, job: Dict) -> str:
         role = persona.get('role', '')
@@ -148,32 +306,109 @@ class DocumentIntelligenceSystem:
         query_parts.append(f"Role: {role}")
         return " | ".join(query_parts)
 
-    def rank_sections(self, sections: List[Dict], query: str) -> List[Dict]:
+    def _encode_cached(self, texts: List[str]) -> torch.Tensor:
+        # Boilerplate repeated across documents (headers, footers, stock
+        # sections) only deserves one forward pass; encode unique texts
+        # and scatter the rows back to every duplicate position.
+        unique_map = {}
+        unique_texts = []
+        positions = []
+        for t in texts:
+            pos = unique_map.get(t)
+            if pos is None:
+                pos = len(unique_texts)
+                unique_map[t] = pos
+                unique_texts.append(t)
+            positions.append(pos)
+        if len(unique_texts) < len(texts):
+            unique_emb = self._encode_cached(unique_texts)
+            return unique_emb[torch.tensor(positions)]
+        keys = [_EmbeddingCache.key(self.model_name, t) for t in texts]
+        hits = self._embedding_cache.lookup(keys)
+        miss_indices = [i for i, k in enumerate(keys) if k not in hits]
+        miss_emb = None
+        if miss_indices:
+            with torch.inference_mode():
+                miss_emb = self.model.encode(
+                    [texts[i] for i in miss_indices],
+                    convert_to_tensor=True,
+                    batch_size=32,
+                    normalize_embeddings=True,
+                    show_progress_bar=False
+                )
+            self._embedding_cache.store({
+                keys[i]: miss_emb[j].cpu().numpy()
+                for j, i in enumerate(miss_indices)
+            })
+        # Match the dtype a fresh encode would return (fp16 after
+        # model.half() on CUDA) even when every text was a cache hit, so
+        # corpus and query tensors always agree at the similarity matmul.
+        param = next(self.model.parameters(), None)
+        emb = torch.empty(
+            (len(texts), self.model.get_sentence_embedding_dimension()),
+            device=self.model.device,
+            dtype=param.dtype if param is not None else torch.float32
+        )
+        for i, k in enumerate(keys):
+            if k in hits:
+                emb[i] = torch.from_numpy(hits[k]).to(emb.device, emb.dtype)
+        for j, i in enumerate(miss_indices):
+            emb[i] = miss_emb[j]
+        return emb
+
+    def _get_corpus_index(self, texts: List[str]) -> tuple:
+        """Encode a corpus once and reuse it (plus a FAISS inner-product
+        index when available) across repeated queries over the same texts."""
+        corpus_key = hashlib.blake2b(
+            "\0".join(texts).encode(), digest_size=16
+        ).hexdigest()
+        cached = self._corpus_cache.get(corpus_key)
+        if cached is not None:
+            return cached
+        embeddings = self._encode_cached(texts)
+        index = None
+        if faiss is not None:
+            # Embeddings are already unit-normalized, so inner product in
+            # the index equals cosine similarity.
+            emb_np = np.ascontiguousarray(
+                embeddings.float().cpu().numpy(), dtype=np.float32
+            )
+            index = faiss.IndexFlatIP(emb_np.shape[1])
+            index.add(emb_np)
+        self._corpus_cache[corpus_key] = (embeddings, index)
+        return embeddings, index
+
+    def rank_sections(self, sections: List[Section], query: str) -> List[Section]:
         if not sections or not self.model:
             return []
-        texts = [s['text'] for s in sections]
-        embeddings = self.model.encode(texts, convert_to_tensor=True)
-        query_embedding = self.model.encode(query, convert_to_tensor=True)
-        similarities = util.pytorch_cos_sim(query_embedding, embeddings)[0]
-        weighted_scores = []
-        for i, (score, section) in enumerate(zip(similarities, sections)):
-            weight = {
-                'abstract': 1.2,
-                'introduction': 1.1,
-                'methodology': 1.3,
-                'results': 1.3,
-                'conclusion': 1.2,
-                'references': 0.5,
-                'content': 1.0
-            }.get(section.get('content_type', 'content'), 1.0)
-            weighted_scores.append((score * weight, i))
-        weighted_scores.sort(reverse=True, key=lambda x: x[0])
+        texts = [s.text for s in sections]
+        embeddings, index = self._get_corpus_index(texts)
+        query_embedding = self._encode_cached([query])
+        if index is not None:
+            q = np.ascontiguousarray(
+                query_embedding.float().cpu().numpy(), dtype=np.float32
+            )
+            scores, ids = index.search(q, len(texts))
+            similarities = torch.empty(len(texts))
+            similarities[torch.from_numpy(ids[0]).long()] = torch.from_numpy(scores[0])
+        else:
+            # Embeddings are unit-normalized, so cosine similarity is a plain
+            # dot product -- a single GEMV instead of norms + division.
+            similarities = embeddings @ query_embedding.squeeze(0)
+        type_ids = torch.tensor(
+            [_TYPE_TO_ID.get(s.content_type, _TYPE_TO_ID['content'])
+             for s in sections]
+        )
+        weights = _WEIGHT_TABLE[type_ids].to(similarities.device, similarities.dtype)
+        weighted = similarities * weights
+        _, top_indices = torch.topk(weighted, k=min(self.top_k, weighted.numel()))
         ranked = []
-        for rank, (_, idx) in enumerate(weighted_scores[:self.top_k]):
-            section = sections[idx].copy()
-            section['importance_rank'] = rank + 1
-            section['relevance_score'] = float(similarities[idx])
-            ranked.append(section)
+        for rank, idx in enumerate(top_indices.tolist()):
+            ranked.append(replace(
+                sections[idx],
+                importance_rank=rank + 1,
+                relevance_score=float(similarities[idx])
+            ))
         return ranked
 
     def process_documents(self, input_data: Dict) -> Dict:
@@ -185,17 +420,21 @@ class DocumentIntelligenceSystem:
         if not self.model:
             self.load_model()
         query = self.create_persona_query(persona, job)
-        all_sections = []
-        processed_docs = []
+        pdf_paths = []
         for doc in documents:
             filename = doc.get('filename', doc) if isinstance(doc, dict) else doc
             pdf_path = os.path.join(pdf_dir, filename)
             if os.path.exists(pdf_path):
-                sections = self.extract_text_chunks(pdf_path)
-                all_sections.extend(sections)
-                processed_docs.append(filename)
+                pdf_paths.append(pdf_path)
             else:
                 logger.warning(f"File not found and skipped: {pdf_path}")
+        all_sections = []
+        processed_docs = []
+        if pdf_paths:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+                for filename, sections in executor.map(_extract_one, pdf_paths):
+                    all_sections.extend(sections)
+                    processed_docs.append(filename)
         top_sections = self.rank_sections(all_sections, query)
         output = {
             "metadata": {
@@ -206,45 +445,49 @@ class DocumentIntelligenceSystem:
             },
             "extracted_sections": [
                 {
-                    "document": s["document"],
-                    "section_title": s["section_title"],
-                    "importance_rank": s["importance_rank"],
-                    "page_number": s["page"]
+                    "document": s.document,
+                    "section_title": s.section_title,
+                    "importance_rank": s.importance_rank,
+                    "page_number": s.page
                 } for s in top_sections
             ],
             "subsection_analysis": [
                 {
-                    "document": s["document"],
-                    "refined_text": s["text"][:500] + "..." if len(s["text"]) > 500 else s["text"],
-                    "page_number": s["page"]
+                    "document": s.document,
+                    "refined_text": s.text[:500] + "..." if len(s.text) > 500 else s.text,
+                    "page_number": s.page
                 } for s in top_sections
             ]
         }
         return output
 
+def _extract_one(pdf_path: str) -> tuple:
+    # Module-level so it pickles cleanly for worker processes. Extraction
+    # never touches the model, so a bare instance is all a worker needs.
+    system = DocumentIntelligenceSystem()
+    return os.path.basename(pdf_path), system.extract_text_chunks(pdf_path)
+
 def main():
     INPUT_JSON = "challenge1b_input.json"
     OUTPUT_JSON = "challenge1b_output.json"
     PDF_DIR = "pdfs"
     try:
-        with open(INPUT_JSON, 'r') as f:
-            input_data = json.load(f)
+        with open(INPUT_JSON, 'rb') as f:
+            input_data = orjson.loads(f.read())
     except FileNotFoundError:
         logger.error(f"Input file '{INPUT_JSON}' not found.")
         return
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         logger.error(f"Failed to decode JSON from '{INPUT_JSON}': {e}")
         return
     input_data['pdf_directory'] = PDF_DIR
     system = DocumentIntelligenceSystem()
     result = system.process_documents(input_data)
     try:
-        with open(OUTPUT_JSON, 'w') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+        with open(OUTPUT_JSON, 'wb') as f:
+            f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
     except Exception as e:
         logger.error(f"Failed to write output to '{OUTPUT_JSON}': {e}")
 
 if __name__ == "__main__":
     main()
-if __name__ == "__main__":
-    main()